@@ -1,12 +1,17 @@
 from queue_task import *
-from random import randint
+from concurrent.futures import ProcessPoolExecutor
 from statistics import mean, stdev
 from math import sqrt
 import itertools
+import random
 import time
 
 genid = itertools.count()  # Infinite source of integers for Task ids
 
+QUEUE_CLASSES = [TaskQueue_list, TaskQueue_dict_of_lists, TaskQueue_dict_of_dicts]
+if np is not None:   # TaskQueue_array requires numpy
+    QUEUE_CLASSES += [TaskQueue_array, TaskQueue_dict_of_arrays]
+
 
 def get_resources(spec: dict):
     """Make a Resource object."""
@@ -17,121 +22,160 @@ def get_resources(spec: dict):
     )
 
 
-def task_generator(resoure_spec, priorityfnc):
+def task_generator(resoure_spec, priorityfnc, _Task=Task, _next=next, _genid=genid):
     """Yield a Task object"""
+    # Millions of tasks are created in the tests, so the lookups are hoisted
+    # out of the loop (the globals are bound as default arguments)
+    ramfnc, cpufnc, gpufnc = resoure_spec['ram'], resoure_spec['cpu'], resoure_spec['gpu']
     while True:
-        yield Task(
-            id=next(genid),
-            priority=priorityfnc(),
-            resources=get_resources(resoure_spec),
-            content='',
-            result=''
-        )
+        yield _Task(_next(_genid), priorityfnc(), ramfnc(), cpufnc(), gpufnc(), '', '')
+
+
+def random_resources(n: int, resoure_ranges: dict) -> list:
+    """Make a list of Resources objects with random amounts of resources."""
+    return list(itertools.starmap(Resources, _random_values(n, resoure_ranges)))
+
+
+def random_tasks(ntasks: int, resoure_ranges: dict, priority_range: range) -> list:
+    """Make a list of Task objects with random resources and priorities."""
+    priorities = random.choices(priority_range, k=ntasks)
+    return [Task(next(genid), priority, ram, cpu, gpu, '', '') for priority, (ram, cpu, gpu)
+            in zip(priorities, _random_values(ntasks, resoure_ranges))]
+
+
+def _random_values(n: int, resoure_ranges: dict):
+    """Iterate over n random (ram, cpu, gpu) tuples.
+
+    The random values are generated in batches by random.choices(), which is
+    much faster than calling randint() for each value.
+    """
+    return zip(random.choices(resoure_ranges['ram'], k=n),
+               random.choices(resoure_ranges['cpu'], k=n),
+               random.choices(resoure_ranges['gpu'], k=n))
+
+
+RANDOM_RESOURE_RANGES = dict(
+    ram=range(1, 501),
+    cpu=range(1, 11),
+    gpu=range(1, 11)
+)
+BIG_RESOURE_SPEC = dict(
+    ram=lambda: 500,
+    cpu=lambda: 10,
+    gpu=lambda: 10
+)
+SMALL_RESOURE_SPEC = dict(
+    ram=lambda: 5,
+    cpu=lambda: 1,
+    gpu=lambda: 1
+)
+
+_tasklist = []   # The tasks of the current test case in a worker process
+
+
+def _init_worker(make_tasklist, *args):
+    """Prepare a worker process: make the list of tasks, warm up numba.
+
+    Making the tasks in the worker is faster than to pickle millions of them.
+    """
+    global _tasklist
+    _tasklist = make_tasklist(*args)
+    if np is not None:
+        TaskQueue_array.warmup()   # Don't time the compilation by numba
+
+
+def _run_attempt(cls, consumer_resources: list) -> tuple:
+    """Fill a new queue with the tasks and get a task from it.
+
+    The attempt is repeated with the next consumer until a task is received.
+    :return: the task, the time to fill the queue and the time of the get_task() call
+    """
+    for consres in consumer_resources:
+        queue = cls()   # Create a new Queue instance
+        tstart_add = time.perf_counter_ns()
+        list(map(queue.add_task, _tasklist))   # fill it
+        tend_add = time.perf_counter_ns()
+        tstart_get = time.perf_counter_ns()
+        task = queue.get_task(consres)   # do job
+        tend_get = time.perf_counter_ns()
+        if task is not None:
+            return task, tend_add - tstart_add, tend_get - tstart_get
+    raise Exception("List of consumer resources has been exhausted. "
+                    "Please, run the test again.")
+
+
+def _run_testcase(ntasks: int, nattempts: int, max_workers: int,
+                  consres_initial_list: list, make_tasklist, *args):
+    """Time all the TaskQueue classes running the attempts in parallel.
+
+    Each worker process makes its own copy of the tasks by calling
+    make_tasklist(ntasks, *args), so it must give the same list every time.
+    Each attempt has its own pair of consumers.
+    """
+    consumer_resources = [consres_initial_list[2*i:2*i + 2] for i in range(nattempts)]
+    with ProcessPoolExecutor(max_workers, initializer=_init_worker,
+                             initargs=(make_tasklist, ntasks, *args)) as executor:
+        for cls in QUEUE_CLASSES:
+            times_add, times_get = [], []
+            for task, time_add, time_get in executor.map(
+                    _run_attempt, itertools.repeat(cls), consumer_resources):
+                print(f'Got {task}')
+                times_add.append(time_add)
+                times_get.append(time_get)
+            print(f'Timing for {cls.__name__}:')
+            print('  Add: {:1.3e} +\- {:1.3e} sec ({:d} calls)'.format(
+                mean(times_add)/1e9, stdev(times_add)/sqrt(nattempts)/1e9, ntasks))
+            print('  Get: {:1.6f} +\- {:1.6f} sec (per call)'.format(
+                mean(times_get)/1e9, stdev(times_get)/sqrt(nattempts)/1e9))
+
+
+def _make_random_tasklist(ntasks: int, seed: int) -> list:
+    """Make the same list of random tasks for the same seed."""
+    random.seed(seed)
+    return random_tasks(ntasks, RANDOM_RESOURE_RANGES, range(1, 6))  # Priorities are from 1 to 5
+
+
+def _make_worst_tasklist(ntasks: int) -> list:
+    """Make ntasks big tasks and a small one at the end."""
+    priorityfnc = lambda: 2  # High priority tasks first
+    taskgen_big = task_generator(BIG_RESOURE_SPEC, priorityfnc)  # Initialize the infinite generator
+    tasklist = list(itertools.islice(taskgen_big, 0, ntasks))  # Slice with ntasks elements
+    # Add one more task (the appropriate one) to the end
+    taskgen_small = task_generator(SMALL_RESOURE_SPEC, lambda: 2)
+    tasklist.append(next(taskgen_small))
+    return tasklist
 
 
-def testcase_random_sample(ntasks: int, nattempts: int):
+def testcase_random_sample(ntasks: int, nattempts: int, max_workers: int = None):
     """General case.
 
     Tasks and clients have random amounts of resources. The priorities
     are also random.
     :param ntasks: number of tasks to put into the queue
     :param nattempts: number of attempts for testing
+    :param max_workers: number of processes running the attempts (the number of CPUs by default)
     """
+    # The tasks are generated from the seed to be able to repeat the test with
+    # different TaskQueue classes. Also save consumers resources to test the
+    # classes in the same conditions
+    seed = random.randrange(2**32)
+    consres_initial_list = random_resources(nattempts*2, RANDOM_RESOURE_RANGES)
+    _run_testcase(ntasks, nattempts, max_workers, consres_initial_list,
+                  _make_random_tasklist, seed)
 
-    random_resoure_spec = dict(
-        ram=lambda: randint(1, 500),
-        cpu=lambda: randint(1, 10),
-        gpu=lambda: randint(1, 10)
-    )
-    priorityfnc = lambda: randint(1, 5)  # Generate priorities from 1 to 10
-    taskgen = task_generator(random_resoure_spec, priorityfnc)  # Initialize the infinite generator
-    # Get the required number of elements and save them to a list to be able
-    # to repeat the test with different TaskQueue classes
-    tasklist = list(itertools.islice(taskgen, 0, ntasks))  # Slice with ntasks elements
-    # Also save consumers resources to test the classes in the same conditions
-    consres_initial_list = [get_resources(random_resoure_spec) for i in range(nattempts*2)]
-
-    for cls in (TaskQueue_list, TaskQueue_dict_of_lists, TaskQueue_dict_of_dicts):
-        times_add, times_get = [], []
-        consumer_resources = consres_initial_list.copy()
-        while len(times_get) < nattempts:
-            queue = cls()   # Create a new Queue instance
-            tstart_add = time.time()
-            list(map(queue.add_task, tasklist))   # fill it
-            tend_add = time.time()
-            if len(consumer_resources) == 0:
-                raise Exception("List of consumer resources has been exhausted. "
-                                "Please, run the test again.")
-            tstart_get = time.time()
-            task = queue.get_task(consumer_resources.pop())   # do job
-            tend_get = time.time()
-            print(f'Got {task}')
-            if task is not None:
-                times_add.append(tend_add - tstart_add)
-                times_get.append(tend_get - tstart_get)
-        print(f'Timing for {cls.__name__}:')
-        print('  Add: {:1.3e} +\- {:1.3e} sec ({:d} calls)'.format(
-            mean(times_add), stdev(times_add)/sqrt(nattempts), ntasks))
-        print('  Get: {:1.6f} +\- {:1.6f} sec (per call)'.format(
-            mean(times_get), stdev(times_get)/sqrt(nattempts)))
-
-
-def testcase_appropriate_task_at_the_end(ntasks: int, nattempts: int):
+
+def testcase_appropriate_task_at_the_end(ntasks: int, nattempts: int, max_workers: int = None):
     """The worst case: the appropriate task is at the end of the queue
 
     There is only one task that satisfies the consumer resources.
     We have to path through all the queue
     :param ntasks: number of tasks to put into the queue
     :param nattempts: number of attempts for testing
+    :param max_workers: number of processes running the attempts (the number of CPUs by default)
     """
-
-    big_resoure_spec = dict(
-        ram=lambda: 500,
-        cpu=lambda: 10,
-        gpu=lambda: 10
-    )
-
-    small_resoure_spec = dict(
-        ram=lambda: 5,
-        cpu=lambda: 1,
-        gpu=lambda: 1
-    )
-    priorityfnc = lambda: 2  # High priority tasks first
-    taskgen_big = task_generator(big_resoure_spec, priorityfnc)  # Initialize the infinite generator
-    # Get the required number of elements and save them to a list to be able
-    # to repeat the test with different TaskQueue classes
-    tasklist = list(itertools.islice(taskgen_big, 0, ntasks))  # Slice with ntasks elements
-    # Also save consumer resources to test the classes in the same conditions
-    consres_initial_list = [get_resources(small_resoure_spec) for i in range(nattempts*2)]
-
-    # Add one more task (the appropriate one) to the end
-    taskgen_small = task_generator(small_resoure_spec, lambda: 2)
-    tasklist.append(next(taskgen_small))
-
-    for cls in (TaskQueue_list, TaskQueue_dict_of_lists, TaskQueue_dict_of_dicts):
-        times_add, times_get = [], []
-        consumer_resources = consres_initial_list.copy()
-        while len(times_get) < nattempts:
-            queue = cls()   # Create a new Queue instance
-            tstart_add = time.time()
-            list(map(queue.add_task, tasklist))   # fill it
-            tend_add = time.time()
-            if len(consumer_resources) == 0:
-                raise Exception("List of consumer resources has been exhausted. "
-                                "Please, run the test again.")
-            tstart_get = time.time()
-            task = queue.get_task(consumer_resources.pop())   # do job
-            tend_get = time.time()
-            print(f'Got {task}')
-            if task is not None:
-                times_add.append(tend_add - tstart_add)
-                times_get.append(tend_get - tstart_get)
-        print(f'Timing for {cls.__name__}:')
-        print('  Add: {:1.3e} +\- {:1.3e} sec ({:d} calls)'.format(
-            mean(times_add), stdev(times_add)/sqrt(nattempts), ntasks))
-        print('  Get: {:1.6f} +\- {:1.6f} sec (per call)'.format(
-            mean(times_get), stdev(times_get)/sqrt(nattempts)))
-
+    # Save consumer resources to test the classes in the same conditions
+    consres_initial_list = [get_resources(SMALL_RESOURE_SPEC) for i in range(nattempts*2)]
+    _run_testcase(ntasks, nattempts, max_workers, consres_initial_list, _make_worst_tasklist)
 
 
 def _main():
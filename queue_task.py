@@ -21,8 +21,8 @@ correspond to lower values of the priority key.
 I. Using a single list as the storage (the TaskQueue_list class).
 The advantage of this approach is the very fast add_task() method. We can just put a new
 task to the end of the list using append() which has a complexity of O(1). When get_task()
-is being called, we use filter() to filters away the tasks that don't  satisfy the resource
-requirements, sort the resultant list and return its first element. Filter() costs O(N). Also,
+is being called, we pass through the list to find the highest priority task among those that
+satisfy the resource requirements and return it. This pass costs O(N). Also,
 we have to remove the selected task from the storage, this (unfortunately) costs O(N) as well.
     The algorithm:
     1) storage = list()
@@ -30,19 +30,21 @@ we have to remove the selected task from the storage, this (unfortunately) costs
     2) The add_task() method puts a task to the end of the list
         storage.append(new_task)   -> O(1)
 
-    3) The get_task() method at the first stage the storage and produces a new list filtered_tasks
-        filtered_tasks = list(filter(condition, storage))   ->O(N)
+    3) The get_task() method passes through the storage once and keeps the index of the
+    best task satisfying the resource requirements. Only a strictly higher priority replaces
+    the current best task, so the tasks with the same priority will save their order
+        for i, task in enumerate(storage):
+            if task.priority < best_priority and condition(task): ...   ->O(N)
 
-    4) Then we use sort() to sort the tasks by their priorities. Note that it guaranties
-    stability, so the tasks with the same priority will save their order
-    (https://docs.python.org/3/howto/sorting.html#sort-stability-and-complex-sorts)
-       filtered_tasks.sort(key=attrgetter('priority'))  ->O(K log K), where K is the length of the filtered list.
+    4) There is no need to sort the filtered tasks, since only the first of them is required
+    (sort() would cost O(K log K), where K is the length of the filtered list).
 
-    5) Get the first item to send it to the consumer
-        task_to_return = selected_tasks(0)  -> O(1)
+    5) Get the best item to send it to the consumer
+        task_to_return = storage[best_index]  -> O(1)
 
-    6) Remove the task from the storage
-        storage.remove(task_to_return)      -> O(N)
+    6) Remove the task from the storage by its index (no search and no Task comparisons
+    as list.remove() would do, but the tail of the list still has to be shifted)
+        del storage[best_index]      -> O(N)
 
 II. The sorted storage
 We can make get_task() faster keeping the storage always sorted. Instead of calling sort()
@@ -66,10 +68,15 @@ dicts preserve their keys order since version 3.7.
     2) The add_task() method puts a new task into the internal dictionary using the priority
     key and the task id key.
         storage[task.priority][task.id] = task  -> O(1)
+    The priority key of the first task of a group is also inserted to the sorted list of
+    priorities using bisect (if it's not there yet), so it isn't necessary to sort the keys
+    every get_task() call.
+        bisect.bisect_left(priorities, task.priority)  -> O(log P), P is the number of priorities
+    When the last task of a group is removed, the group and its priority key are removed too.
 
     3) The get_task() begins a double loop over priorities and ids to check the requirements
     (O(N) in the worst case).
-        for priority in sorted(storage.keys()):
+        for priority in priorities:
             for id in storage[priority]:
                 pass
 
@@ -80,7 +87,41 @@ dicts preserve their keys order since version 3.7.
 III. Further improvements
 If the consumer have strong limitations of its resources, it has to pass through whole the queue
 to find an appropriate task. Therefore, it could be reasonable to skip groups that don’t have any
-appropriate task at all. It can be implemented by storing the minimal requirements for each group.
+appropriate task at all. It can be implemented by storing the minimal requirements for each
+group. TaskQueue_dict_of_dicts keeps such bounds and skips a group in O(1) if the consumer can't
+satisfy them. A removal of a task can only increase the real minimal requirements, so the stored
+bounds remain valid. They are recalculated when a group has been passed through in vain after a
+removal of the task that defined one of the bounds. In the same way both TaskQueue_dict_of_lists
+and TaskQueue_dict_of_dicts keep the minimal requirements of all the tasks, so get_task()
+returns immediately if the consumer can't satisfy any task or the queue is empty.
+
+IV. Structure of arrays (the TaskQueue_array class, requires numpy)
+Whatever the storage is, the python loop over the Task objects is the bottleneck of get_task()
+in the worst case. Instead, the fields that get_task() needs can be stored in separate numpy
+arrays (priority, ram, cpu, gpu and the 'alive' flag) while the Task objects are kept in a
+side list at the same positions. Then the scan is done by numpy without the python loop.
+    The algorithm:
+    1) The arrays are preallocated and their capacity is doubled when they are full, so
+    add_task() is O(1) amortized. The resources are stored as uint16, the narrow type
+    reduces the memory traffic of the scan.
+
+    2) get_task() builds a mask of the tasks satisfying the requirements and selects the
+    candidate with the minimal priority key. The tasks are stored in the order of their
+    addition, so argmin() (which returns the first minimum) keeps the order of the tasks
+    with the same priority
+        candidates = np.flatnonzero(alive & (ram <= ar) & (cpu <= ac) & (gpu <= ag))   -> O(N)
+
+    If numba is installed and the queue has millions of tasks, the scan is a single compiled
+    loop instead (the _scan function). numba is imported only when it's required for the
+    first time.
+
+    3) The selected task is only marked as removed in the 'alive' array, so the removal is
+    O(1). When more than half of the stored tasks are removed, the remaining ones are moved
+    to the beginning of the arrays (O(N), but it happens once per N/2 removals).
+
+The same arrays can store the groups of tasks with the same priority (the
+TaskQueue_dict_of_arrays class). In this case get_task() doesn't need to compare the priorities
+within a group, it takes the first task satisfying the requirements (np.argmax() of the mask).
 
 
 ## Result of the performance testing:
@@ -122,12 +163,18 @@ properties of the tasks are random).
 
 
 import bisect
+import functools
+import math
 from dataclasses import dataclass
-from operator import attrgetter
 from collections import defaultdict
 
+try:
+    import numpy as np
+except ImportError:  # numpy is only required by TaskQueue_array
+    np = None
+
 
-@dataclass
+@dataclass(slots=True)
 class Resources:
     ram: int
     cpu_cores: int
@@ -140,17 +187,57 @@ class Resources:
                 self.gpu_count <= other.gpu_count)
 
 
-@dataclass
 class Task:
-    id: int
-    priority: int
-    resources: Resources
-    content: str
-    result: str
+    """A task with its priority and required resources.
+
+    Millions of tasks are created in the performance tests, so the class is
+    written by hand: the positional __init__ is faster than the one generated
+    by @dataclass. Tasks are compared by identity.
+    """
+    # The required resources are stored in the task itself (not as a Resources
+    # object) to save one attribute lookup per resource in the get_task() loops
+    __slots__ = ('id', 'priority', 'ram', 'cpu_cores', 'gpu_count', 'content', 'result')
+
+    def __init__(self, id: int, priority: int, ram: int, cpu_cores: int, gpu_count: int,
+                 content: str, result: str):
+        self.id = id
+        self.priority = priority
+        self.ram = ram
+        self.cpu_cores = cpu_cores
+        self.gpu_count = gpu_count
+        self.content = content
+        self.result = result
+
+    @property
+    def resources(self) -> Resources:
+        """The required resources as a Resources object."""
+        return Resources(self.ram, self.cpu_cores, self.gpu_count)
 
     def __repr__(self):
         """Make the output shorter for debugging purposes."""
-        return 'T(id={id}, pri={priority}, res={resources}'.format(**self.__dict__)
+        return f'T(id={self.id}, pri={self.priority}, res={self.resources}'
+
+
+def _unpack(resources: Resources) -> tuple:
+    """Get the amounts of resources as a tuple to hoist them out of loops."""
+    return resources.ram, resources.cpu_cores, resources.gpu_count
+
+
+_NO_BOUNDS = (math.inf, math.inf, math.inf)   # Requirements of an empty group
+
+
+def _lower_bounds(tasks) -> tuple:
+    """Get the minimal amounts of the resources required by the tasks (a collection)."""
+    return (min((task.ram for task in tasks), default=math.inf),
+            min((task.cpu_cores for task in tasks), default=math.inf),
+            min((task.gpu_count for task in tasks), default=math.inf))
+
+
+def _insert_priority(priorities: list, priority: int):
+    """Insert the priority key into the sorted list if it isn't there yet."""
+    i = bisect.bisect_left(priorities, priority)
+    if i == len(priorities) or priorities[i] != priority:
+        priorities.insert(i, priority)
 
 
 class _MixinPrint:
@@ -172,15 +259,19 @@ class TaskQueue_list(_MixinPrint):
         self.storage.append(new_task)
 
     def get_task(self, available_resources: Resources) -> Task:
-        condition = lambda x: x.resources <= available_resources
-        filtered_tasks = list(filter(condition, self.storage))
         # We assume that higher task priorities correspond to lower values
-        # of the priority key. In this case the order of the tasks with the
-        # same priority key will be preserved during sorting.
-        filtered_tasks.sort(key=attrgetter('priority'))
-        if len(filtered_tasks) > 0:
-            task_to_return = filtered_tasks[0]
-            self.storage.remove(task_to_return)
+        # of the priority key. Only a strictly better priority replaces the
+        # current best task, so the order of the tasks with the same priority
+        # key is preserved.
+        ar, ac, ag = _unpack(available_resources)
+        best_priority, best_index = math.inf, None
+        for i, task in enumerate(self.storage):
+            if (task.priority < best_priority and
+                    task.ram <= ar and task.cpu_cores <= ac and task.gpu_count <= ag):
+                best_priority, best_index = task.priority, i
+        if best_index is not None:
+            task_to_return = self.storage[best_index]
+            del self.storage[best_index]
             return task_to_return
 
 
@@ -190,20 +281,46 @@ class TaskQueue_dict_of_lists(_MixinPrint):
 
     def __init__(self):
         self.storage = defaultdict(list)
+        self.priorities = []   # The sorted keys of the storage
+        # The minimal requirements of all the tasks, they are kept in the same
+        # way as the bounds of the groups in TaskQueue_dict_of_dicts
+        self.total_bounds = _NO_BOUNDS
+        self.dirty = False
 
     def __str__(self):
         lst = [x for sublist in self.storage.values() for x in sublist]
         return '\n'.join(str(x) for x in lst)
 
     def add_task(self, new_task: Task):
-        self.storage[new_task.priority].append(new_task)
+        group = self.storage[new_task.priority]
+        if not group:
+            _insert_priority(self.priorities, new_task.priority)
+        group.append(new_task)
+        ram, cpu, gpu = new_task.ram, new_task.cpu_cores, new_task.gpu_count
+        min_ram, min_cpu, min_gpu = self.total_bounds
+        if ram < min_ram or cpu < min_cpu or gpu < min_gpu:
+            self.total_bounds = (min(ram, min_ram), min(cpu, min_cpu), min(gpu, min_gpu))
 
     def get_task(self, available_resources: Resources) -> Task:
-        for priority in sorted(self.storage.keys()):
-            for curtask in self.storage[priority]:
-                if curtask.resources <= available_resources:
-                    self.storage[priority].remove(curtask)
+        ar, ac, ag = _unpack(available_resources)
+        min_ram, min_cpu, min_gpu = self.total_bounds
+        if min_ram > ar or min_cpu > ac or min_gpu > ag:
+            return None   # None of the tasks can be satisfied (or the queue is empty)
+        for priority in self.priorities:
+            group = self.storage[priority]
+            for idx, curtask in enumerate(group):
+                if curtask.ram <= ar and curtask.cpu_cores <= ac and curtask.gpu_count <= ag:
+                    del group[idx]
+                    if not group:
+                        del self.storage[priority]
+                        self.priorities.remove(priority)
+                    if (curtask.ram == min_ram or curtask.cpu_cores == min_cpu or
+                            curtask.gpu_count == min_gpu):
+                        self.dirty = True
                     return curtask
+        if self.dirty:
+            self.dirty = False
+            self.total_bounds = _lower_bounds([x for group in self.storage.values() for x in group])
 
 
 class TaskQueue_dict_of_dicts(_MixinPrint):
@@ -212,17 +329,265 @@ class TaskQueue_dict_of_dicts(_MixinPrint):
 
     def __init__(self):
         self.storage = defaultdict(dict)
+        self.priorities = []   # The sorted keys of the storage
+        # The minimal requirements of the tasks of each group. A removal can
+        # only make the real requirements higher, so the stored values remain
+        # valid lower bounds. If the removed task defined a bound, the group
+        # is marked as dirty and its bounds are recalculated the next time the
+        # group has been passed through without a result.
+        self.bounds = {}
+        self.dirty = set()
+        # The minimal requirements of all the tasks, a consumer that can't satisfy
+        # them doesn't even pass through the groups. They are recalculated from
+        # the bounds of the groups if no task has been found.
+        self.total_bounds = _NO_BOUNDS
 
     def __str__(self):
         lst = [x for subdict in self.storage.values() for x in subdict.values()]
         return '\n'.join(str(x) for x in lst)
 
     def add_task(self, new_task: Task):
-        self.storage[new_task.priority][new_task.id] = new_task
+        group = self.storage[new_task.priority]
+        if not group:
+            _insert_priority(self.priorities, new_task.priority)
+        group[new_task.id] = new_task
+        ram, cpu, gpu = new_task.ram, new_task.cpu_cores, new_task.gpu_count
+        min_ram, min_cpu, min_gpu = self.bounds.get(new_task.priority, _NO_BOUNDS)
+        if ram < min_ram or cpu < min_cpu or gpu < min_gpu:
+            self.bounds[new_task.priority] = (min(ram, min_ram), min(cpu, min_cpu),
+                                              min(gpu, min_gpu))
+            # The total bounds can only be lowered if the bounds of the group are lowered
+            min_ram, min_cpu, min_gpu = self.total_bounds
+            self.total_bounds = (min(ram, min_ram), min(cpu, min_cpu), min(gpu, min_gpu))
 
     def get_task(self, available_resources: Resources) -> Task:
-        for priority in sorted(self.storage.keys()):
-            for id, curtask in self.storage[priority].items():
-                if curtask.resources <= available_resources:
-                    del self.storage[priority][id]
+        ar, ac, ag = _unpack(available_resources)
+        min_ram, min_cpu, min_gpu = self.total_bounds
+        if min_ram > ar or min_cpu > ac or min_gpu > ag:
+            return None   # None of the tasks can be satisfied (or the queue is empty)
+        storage, bounds = self.storage, self.bounds
+        for priority in self.priorities:
+            min_ram, min_cpu, min_gpu = bounds.get(priority, _NO_BOUNDS)
+            if min_ram > ar or min_cpu > ac or min_gpu > ag:
+                continue   # None of the tasks in the group can be satisfied
+            group = storage[priority]
+            # The key of a task is its id, so the (key, task) pairs are not needed
+            for curtask in group.values():
+                if curtask.ram <= ar and curtask.cpu_cores <= ac and curtask.gpu_count <= ag:
+                    del group[curtask.id]
+                    if not group:
+                        del storage[priority], bounds[priority]
+                        self.priorities.remove(priority)
+                        self.dirty.discard(priority)
+                    elif (curtask.ram == min_ram or curtask.cpu_cores == min_cpu or
+                            curtask.gpu_count == min_gpu):
+                        self.dirty.add(priority)
                     return curtask
+            if priority in self.dirty:
+                self.dirty.remove(priority)
+                bounds[priority] = _lower_bounds(group.values())
+        self.total_bounds = tuple(map(min, zip(_NO_BOUNDS, *bounds.values())))
+
+
+_INT64_MAX = 2**63 - 1
+
+
+def _scan(priority, ram, cpu, gpu, alive, n, ar, ac, ag) -> int:
+    """Get the index of the best task satisfying the resources, or -1.
+
+    The same as TaskQueue_array._scan() but in a single pass, to be compiled by numba.
+    The conditions are combined with & (not 'and') so the loop has no unpredictable
+    branches and can be vectorized. A task with the priority key 2**63-1 is never found.
+    """
+    best_i, best_p = -1, _INT64_MAX
+    for i in range(n):
+        ok = alive[i] & (ram[i] <= ar) & (cpu[i] <= ac) & (gpu[i] <= ag) & (priority[i] < best_p)
+        if ok:
+            best_i, best_p = i, priority[i]
+    return best_i
+
+
+@functools.cache
+def _scan_numba():
+    """Get _scan compiled by numba, or None if numba is not installed.
+
+    numba is imported on the first call only, since the import itself takes
+    a noticeable time that a small queue never wins back.
+    """
+    try:
+        from numba import njit
+    except ImportError:  # TaskQueue_array falls back to the numpy scan
+        return None
+    return njit(cache=True, boundscheck=False)(_scan)
+
+
+class _MixinArrays(_MixinPrint):
+    """The tasks are stored in numpy arrays (the columns listed in _fields),
+    the Task objects are stored in a list at the same positions"""
+
+    # The resources are stored as uint16 to reduce the amount of memory
+    # the scan has to pass through
+    _fields = dict(ram='uint16', cpu='uint16', gpu='uint16', alive='bool')
+    _res_max = 2**16 - 1
+
+    def __init__(self, capacity: int = 1024):
+        if np is None:
+            raise ImportError(f'{type(self).__name__} requires numpy')
+        self.storage = []   # Removed tasks are replaced with None
+        self.live_count = 0
+        for name, dtype in self._fields.items():
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+
+    def __str__(self):
+        return '\n'.join(str(x) for x in self.storage if x is not None)
+
+    def _grow(self):
+        """Double the capacity of the arrays."""
+        for name in self._fields:
+            old = getattr(self, name)
+            new = np.empty(2 * len(old), dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def _append(self, new_task: Task) -> int:
+        """Put the task and its resources to the end, return its index."""
+        if not (0 <= new_task.ram <= self._res_max and
+                0 <= new_task.cpu_cores <= self._res_max and
+                0 <= new_task.gpu_count <= self._res_max):
+            raise ValueError(f'The resources of {new_task!r} are out of the range '
+                             f'0..{self._res_max}')
+        i = len(self.storage)
+        if i == len(self.alive):
+            self._grow()
+        self.ram[i] = new_task.ram
+        self.cpu[i] = new_task.cpu_cores
+        self.gpu[i] = new_task.gpu_count
+        self.alive[i] = True
+        self.storage.append(new_task)
+        self.live_count += 1
+        return i
+
+    def _limits(self, available_resources: Resources) -> tuple:
+        """Get the consumer's resources clipped to the range of the arrays."""
+        # A consumer may have more resources than a task can require
+        return tuple(min(x, self._res_max) for x in _unpack(available_resources))
+
+    def _mask(self, n, ar, ac, ag):
+        """Get the mask of the first n tasks satisfying the resources."""
+        return self.alive[:n] & (self.ram[:n] <= ar) & (self.cpu[:n] <= ac) & (self.gpu[:n] <= ag)
+
+    def _remove(self, idx) -> Task:
+        """Mark the task as removed, compact the arrays if half of them are removed."""
+        task_to_return = self.storage[idx]
+        self.storage[idx] = None
+        self.alive[idx] = False
+        self.live_count -= 1
+        if self.live_count < len(self.storage) // 2:
+            self._compact()
+        return task_to_return
+
+    def _compact(self):
+        """Move the remaining tasks to the beginning keeping their order."""
+        keep = np.flatnonzero(self.alive[:len(self.storage)])
+        for name in self._fields:
+            arr = getattr(self, name)
+            arr[:len(keep)] = arr[keep]
+        self.storage = [self.storage[i] for i in keep]
+
+
+class TaskQueue_array(_MixinArrays):
+    """The fields required by get_task() are stored in numpy arrays,
+    the Task objects are stored in a list at the same positions.
+
+    The resources of a task must be in the range 0..65535 (uint16).
+    """
+
+    _fields = dict(priority='int64', **_MixinArrays._fields)
+    # Smaller queues are scanned by numpy, so numba is not even imported. The
+    # compiled loop wins on random tasks only for millions of them (1.5x at
+    # 2M), while numpy is faster (~2x) if only a few tasks satisfy the consumer.
+    numba_min_size = 2000000
+
+    @classmethod
+    def warmup(cls):
+        """Import numba and compile _scan (or load it from the cache) in advance.
+
+        Otherwise it's done by the first get_task() call on a large queue.
+        """
+        scan = _scan_numba()
+        if scan is not None:
+            queue = cls(capacity=1)
+            scan(queue.priority, queue.ram, queue.cpu, queue.gpu, queue.alive, 0, 0, 0, 0)
+
+    def add_task(self, new_task: Task):
+        i = self._append(new_task)
+        self.priority[i] = new_task.priority
+
+    def get_task(self, available_resources: Resources) -> Task:
+        n = len(self.storage)
+        ar, ac, ag = self._limits(available_resources)
+        scan = _scan_numba() if n >= self.numba_min_size else None
+        if scan is not None:
+            best = scan(self.priority, self.ram, self.cpu, self.gpu, self.alive, n, ar, ac, ag)
+        else:
+            best = self._scan(n, ar, ac, ag)
+        if best >= 0:
+            return self._remove(best)
+
+    def _scan(self, n, ar, ac, ag) -> int:
+        """Get the index of the best task satisfying the resources, or -1."""
+        candidates = np.flatnonzero(self._mask(n, ar, ac, ag))
+        if len(candidates) == 0:
+            return -1
+        # argmin() returns the first (i.e. the earliest) of the highest priority candidates
+        return candidates[self.priority[candidates].argmin()]
+
+
+class _ArrayGroup(_MixinArrays):
+    """A group of tasks with the same priority key stored in numpy arrays.
+
+    The priority isn't stored, get_task() returns the first task satisfying
+    the resources.
+    """
+
+    def add_task(self, new_task: Task):
+        self._append(new_task)
+
+    def get_task(self, available_resources: Resources) -> Task:
+        n = len(self.storage)
+        if n == 0:
+            return None
+        mask = self._mask(n, *self._limits(available_resources))
+        i = mask.argmax()   # Stops at the first True
+        if mask[i]:
+            return self._remove(i)
+
+
+class TaskQueue_dict_of_arrays(_MixinPrint):
+    """Tasks are slit into groups depending on the priority key,
+    each group is stored in numpy arrays"""
+
+    def __init__(self):
+        if np is None:
+            raise ImportError('TaskQueue_dict_of_arrays requires numpy')
+        self.storage = defaultdict(_ArrayGroup)
+        self.priorities = []   # The sorted keys of the storage
+
+    def __str__(self):
+        return '\n'.join(str(x) for x in self.storage.values() if x.live_count > 0)
+
+    def add_task(self, new_task: Task):
+        group = self.storage[new_task.priority]
+        if group.live_count == 0:
+            _insert_priority(self.priorities, new_task.priority)
+        group.add_task(new_task)
+
+    def get_task(self, available_resources: Resources) -> Task:
+        for priority in self.priorities:
+            group = self.storage[priority]
+            task = group.get_task(available_resources)
+            if task is not None:
+                if group.live_count == 0:
+                    del self.storage[priority]
+                    self.priorities.remove(priority)
+                return task
@@ -1,8 +1,10 @@
 import unittest
 from unittest import TestCase
 from queue_task import *
+from queue_task import _scan, _scan_numba
 from performance_test import task_generator
 from copy import copy
+from importlib.util import find_spec
 
 
 class TestResourcesClass(TestCase):
@@ -41,6 +43,7 @@ class TestTaskQueue_dict_of_dicts(TestCase):
             queue.add_task(task)
 
         self.assertEqual(len(queue.storage),2)
+        self.assertEqual(queue.priorities, [1, 2])
         self.assertEqual(len(queue.storage[2]),4)
         self.assertEqual(list(queue.storage[1].values()), [tasks[1]])
         del tasks[1]
@@ -55,13 +58,201 @@ class TestTaskQueue_dict_of_dicts(TestCase):
 
         consum_res = copy(tasks[0].resources)
         self.assertEqual(queue.get_task(consum_res), tasks[2])
+        self.assertEqual(queue.priorities, [2])   # The group is empty
+        self.assertNotIn(1, queue.bounds)
         self.assertEqual(queue.get_task(consum_res), tasks[0])
         self.assertEqual(len(queue.storage[2]), 3)
-        self.assertEqual(len(queue.storage[1]), 0)
+        self.assertNotIn(1, queue.storage)
         consum_res.ram = 1
         self.assertEqual(queue.get_task(consum_res), None)
         self.assertEqual(len(queue.storage[2]), 3)
 
+    def test_group_bounds(self):
+        tasks = self.create_tasks(3)
+        tasks[0].priority = 1
+        queue = TaskQueue_dict_of_dicts()
+        for task in tasks:
+            queue.add_task(task)
+        queue.add_task(Task(-1, 1, 3, 2, 2, '', ''))
+        self.assertEqual(queue.bounds, {1: (3, 1, 1), 2: (5, 1, 1)})
+        self.assertEqual(queue.total_bounds, (3, 1, 1))
+
+        consum_res = Resources(ram=4, cpu_cores=2, gpu_count=2)
+        self.assertEqual(queue.get_task(consum_res).id, -1)
+        self.assertEqual(queue.dirty, {1})
+        self.assertEqual(queue.get_task(consum_res), None)
+        self.assertEqual(queue.dirty, set())
+        self.assertEqual(queue.bounds, {1: (5, 1, 1), 2: (5, 1, 1)})
+        self.assertEqual(queue.total_bounds, (5, 1, 1))
+        self.assertIs(queue.get_task(copy(tasks[0].resources)), tasks[0])
+
+
+class TestTaskQueue_dict_of_lists(TestCase):
+
+    create_tasks = TestTaskQueue_dict_of_dicts.create_tasks
+
+    def test_total_bounds(self):
+        tasks = self.create_tasks(3)
+        tasks[0].ram = 3
+        queue = TaskQueue_dict_of_lists()
+        self.assertEqual(queue.get_task(Resources(1, 1, 1)), None)   # Empty
+        for task in tasks:
+            queue.add_task(task)
+        self.assertEqual(queue.total_bounds, (3, 1, 1))
+
+        consum_res = Resources(ram=4, cpu_cores=1, gpu_count=1)
+        self.assertIs(queue.get_task(consum_res), tasks[0])
+        self.assertTrue(queue.dirty)
+        self.assertEqual(queue.get_task(consum_res), None)
+        self.assertFalse(queue.dirty)
+        self.assertEqual(queue.total_bounds, (5, 1, 1))
+        self.assertIs(queue.get_task(copy(tasks[1].resources)), tasks[1])
+        self.assertIs(queue.get_task(copy(tasks[2].resources)), tasks[2])
+        self.assertEqual(queue.priorities, [])
+        self.assertEqual(dict(queue.storage), {})
+
+
+class TestTaskQueue_list(TestCase):
+
+    create_tasks = TestTaskQueue_dict_of_dicts.create_tasks
+
+    def test_get_task(self):
+        tasks = self.create_tasks(5)
+        tasks[2].priority = 1
+        tasks[3].priority = 1
+        queue = TaskQueue_list()
+        for task in tasks:
+            queue.add_task(task)
+
+        consum_res = copy(tasks[0].resources)
+        self.assertIs(queue.get_task(consum_res), tasks[2])
+        self.assertIs(queue.get_task(consum_res), tasks[3])
+        self.assertIs(queue.get_task(consum_res), tasks[0])
+        self.assertEqual(queue.storage, [tasks[1], tasks[4]])
+        consum_res.ram = 1
+        self.assertEqual(queue.get_task(consum_res), None)
+        self.assertEqual(len(queue.storage), 2)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestTaskQueue_array(TestCase):
+
+    create_tasks = TestTaskQueue_dict_of_dicts.create_tasks
+
+    def test_add_task(self):
+        tasks = self.create_tasks(5)
+        queue = TaskQueue_array(capacity=2)
+        for task in tasks:
+            queue.add_task(task)
+
+        self.assertEqual(queue.storage, tasks)
+        self.assertEqual(len(queue.priority), 8)
+        self.assertEqual(list(queue.ram[:5]), [5] * 5)
+        self.assertEqual(queue.ram.dtype, np.uint16)
+
+    def test_add_task_out_of_range(self):
+        queue = TaskQueue_array()
+        for ram in (-1, 2**16):
+            with self.assertRaises(ValueError):
+                queue.add_task(Task(0, 1, ram, 1, 1, '', ''))
+        self.assertEqual(queue.storage, [])
+
+    def test_get_task(self):
+        tasks = self.create_tasks(5)
+        tasks[2].priority = 1
+        tasks[3].priority = 1
+        queue = TaskQueue_array(capacity=2)
+        for task in tasks:
+            queue.add_task(task)
+
+        consum_res = copy(tasks[0].resources)
+        self.assertIs(queue.get_task(consum_res), tasks[2])
+        self.assertIs(queue.get_task(consum_res), tasks[3])
+        self.assertEqual(queue.storage, [tasks[0], tasks[1], None, None, tasks[4]])
+        self.assertIs(queue.get_task(consum_res), tasks[0])
+        self.assertIs(queue.get_task(consum_res), tasks[1])
+        self.assertEqual(queue.storage, [tasks[4]])   # Compacted
+        consum_res.ram = 1
+        self.assertEqual(queue.get_task(consum_res), None)
+        self.assertIs(queue.get_task(Resources(2**20, 2**20, 2**20)), tasks[4])
+
+    def test_get_task_numba(self):
+        TaskQueue_array.warmup()
+        queue = TaskQueue_array(capacity=2)
+        queue.numba_min_size = 0
+        tasks = self.create_tasks(3)
+        tasks[1].priority = 1
+        for task in tasks:
+            queue.add_task(task)
+
+        consum_res = copy(tasks[0].resources)
+        self.assertIs(queue.get_task(consum_res), tasks[1])
+        self.assertIs(queue.get_task(consum_res), tasks[0])
+        self.assertIs(queue.get_task(consum_res), tasks[2])
+        self.assertEqual(queue.get_task(consum_res), None)
+
+    @unittest.skipIf(find_spec('numba') is None, 'numba is not installed')
+    def test_scan_numba(self):
+        queue = TaskQueue_array()
+        for task in self.create_tasks(10):
+            queue.add_task(task)
+        queue.priority[:10] = [3, 2, 1, 1, 2, 1, 3, 1, 2, 2]
+        queue.ram[:10] = [1, 1, 9, 5, 1, 4, 1, 2, 1, 1]
+        queue.alive[:10] = [True, True, False, True, True, True, True, True, True, True]
+        args = (queue.priority, queue.ram, queue.cpu, queue.gpu, queue.alive, 10)
+        for ram in (0, 1, 2, 4, 5, 9):
+            expected = queue._scan(10, ram, 1, 1)
+            self.assertEqual(_scan_numba()(*args, ram, 1, 1), expected)
+            self.assertEqual(_scan(*args, ram, 1, 1), expected)
+
+
+@unittest.skipIf(np is None, 'numpy is not installed')
+class TestTaskQueue_dict_of_arrays(TestCase):
+
+    create_tasks = TestTaskQueue_dict_of_dicts.create_tasks
+
+    def test_add_task(self):
+        tasks = self.create_tasks(5)
+        tasks[1].priority = 1
+        queue = TaskQueue_dict_of_arrays()
+        for task in tasks:
+            queue.add_task(task)
+
+        self.assertEqual(queue.priorities, [1, 2])
+        self.assertEqual(queue.storage[1].storage, [tasks[1]])
+        self.assertFalse(hasattr(queue.storage[1], 'priority'))
+        del tasks[1]
+        self.assertEqual(queue.storage[2].storage, tasks)
+
+    def test_get_task(self):
+        tasks = self.create_tasks(5)
+        tasks[2].priority = 1
+        tasks[3].ram = 6
+        queue = TaskQueue_dict_of_arrays()
+        for task in tasks:
+            queue.add_task(task)
+
+        consum_res = copy(tasks[0].resources)
+        self.assertIs(queue.get_task(consum_res), tasks[2])
+        self.assertIs(queue.get_task(consum_res), tasks[0])
+        self.assertIs(queue.get_task(consum_res), tasks[1])
+        self.assertIs(queue.get_task(consum_res), tasks[4])
+        self.assertEqual(queue.get_task(consum_res), None)
+        consum_res.ram = 6
+        self.assertIs(queue.get_task(consum_res), tasks[3])
+
+    def test_empty_group(self):
+        tasks = self.create_tasks(3)
+        tasks[2].priority = 3
+        queue = TaskQueue_dict_of_arrays()
+        for task in tasks:
+            queue.add_task(task)
+
+        consum_res = copy(tasks[0].resources)
+        self.assertEqual([queue.get_task(consum_res) for i in range(3)], tasks)
+        self.assertEqual(queue.priorities, [])
+        self.assertEqual(queue.get_task(consum_res), None)
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file